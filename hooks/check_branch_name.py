@@ -4,23 +4,86 @@ Pre-commit hook to check the branch name format against regex patterns.
 One or multiple acceptance/rejection patterns can be supplied as arguments.
 """
 
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from enum import Enum
-import argparse
+import functools
+import os
 import re
-import subprocess
+import sys
 
+if TYPE_CHECKING:
+    import argparse
 
-class TextStyle(Enum):
+
+# Coloured message prefixes, with the style reset already applied
+ERR_PREFIX = "\033[1;31m[ERR]\033[0m"  # Bold Red
+WARN_PREFIX = "\033[1;33m[WARN]\033[0m"  # Bold Yellow
+
+
+# Constructs that depend on group numbering or group names, or global inline flags
+# that would apply to every pattern, and so cannot be safely combined into a single
+# alternation
+UNCOMBINABLE_PATTERN = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)")
+
+HEAD_BRANCH_PREFIX = b"ref: refs/heads/"
+
+# Repositories using the reftable backend keep a stub HEAD pointing at this invalid branch
+REFTABLE_STUB_HEAD = b"ref: refs/heads/.invalid"
+
+# A detached HEAD holds a SHA-1 or SHA-256 commit hash
+DETACHED_HEAD_PATTERN = re.compile(rb"[0-9a-f]{40}|[0-9a-f]{64}")
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str) -> re.Pattern:
     """
-    Enumeration for PASS/WARN/ERR colour codes.
+    Compile a regex pattern, reusing the result for repeated patterns.
+
+    :param pattern: the regex pattern to compile (str)
+    :return: the compiled pattern (re.Pattern)
     """
+    return re.compile(pattern)
 
-    DEFAULT = "\033[0m"  # Reset all styles
-    WARN = "\033[1;33m"  # Bold Yellow
-    ERROR = "\033[1;31m"  # Bold Red
-    OK = "\033[1;32m"  # Bold Green
+
+@functools.lru_cache(maxsize=256)
+def _compile_combined(patterns: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """
+    Combine regex patterns into a single alternation, one named group per pattern.
+
+    :param patterns: the regex patterns to combine, each already known to compile (Tuple[str, ...])
+    :return: the combined pattern, or None if the patterns cannot be combined (re.Pattern)
+    """
+    if any(UNCOMBINABLE_PATTERN.search(pattern) for pattern in patterns):
+        return None
+
+    try:
+        return re.compile(
+            "|".join(f"(?P<_p{i}>{pattern})" for i, pattern in enumerate(patterns))
+        )
+    except re.error:
+        # e.g. clashing group names
+        return None
+
+
+def _first_match(patterns: List[re.Pattern], string: str) -> Optional[str]:
+    """
+    Find the first of the compiled patterns that matches the whole of a string.
+
+    :param patterns: the compiled patterns to try, in order (List[re.Pattern])
+    :param string: the string to match against (str)
+    :return: the source of the first matching pattern, or None if none match (str)
+    """
+    combined = _compile_combined(tuple(pattern.pattern for pattern in patterns))
+    if combined is None:
+        for pattern in patterns:
+            if pattern.fullmatch(string):
+                return pattern.pattern
+        return None
+
+    match = combined.fullmatch(string)
+    if match is None:
+        return None
+    return patterns[int(match.lastgroup[2:])].pattern
 
 
 def check_branch_name(
@@ -29,7 +92,7 @@ def check_branch_name(
     reject_patterns: List[str] = None,
 ) -> Tuple[int, str]:
     """
-    Check branch name against provided acceptance and rejection patterns.
+    Check branch name against provided acceptance and rejection patterns, which must match the whole name.
 
     :param branch_name: The branch name to check (str)
     :param accept_patterns: a list of regular expressions to accept the branch name (List[str], defaults to ['.*']) (optional)
@@ -42,9 +105,9 @@ def check_branch_name(
              - 99: Error occurred during compilation of regex patterns
     """
     compiled_accept_patterns = []
-    for pattern in accept_patterns or [".*"]:
+    for pattern in accept_patterns or []:
         try:
-            compiled_accept_patterns.append(re.compile(pattern))
+            compiled_accept_patterns.append(_compile(pattern))
         except re.error as e:
             msg = f"Error compiling accept pattern: {pattern} ({e})"
             return 99, msg
@@ -52,43 +115,119 @@ def check_branch_name(
     compiled_reject_patterns = []
     for pattern in reject_patterns or []:
         try:
-            compiled_reject_patterns.append(re.compile(pattern))
+            compiled_reject_patterns.append(_compile(pattern))
         except re.error as e:
             msg = f"Error compiling reject pattern: {pattern} ({e})"
             return 99, msg
 
-    for pattern in compiled_reject_patterns:
-        if pattern.match(branch_name):
-            msg = f"Branch name matched rejection pattern: {pattern.pattern}"
+    if compiled_reject_patterns:
+        matched_pattern = _first_match(compiled_reject_patterns, branch_name)
+        if matched_pattern is not None:
+            msg = f"Branch name matched rejection pattern: {matched_pattern}"
             return 2, msg
 
-    for pattern in compiled_accept_patterns:
-        if pattern.match(branch_name):
-            return 0, ""
+    # No acceptance patterns means the default '.*', which always matches
+    if not compiled_accept_patterns:
+        return 0, ""
+
+    if _first_match(compiled_accept_patterns, branch_name) is not None:
+        return 0, ""
 
     msg = "Branch name did not match any of the acceptance patterns supplied"
     return 1, msg
 
 
+def _find_git_dir() -> Optional[str]:
+    """
+    Find the git directory for the current working directory.
+
+    Follows the `gitdir:` redirect used by worktrees and submodules, where `.git` is a file.
+
+    :return: path to the git directory, or None if it could not be found (str)
+    """
+    git_dir = os.environ.get("GIT_DIR")
+    if git_dir:
+        return git_dir
+
+    directory = os.getcwd()
+    while True:
+        dot_git = os.path.join(directory, ".git")
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git) as f:
+                content = f.read().strip()
+            if content.startswith("gitdir:"):
+                return os.path.join(directory, content[len("gitdir:"):].strip())
+            return None
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _read_branch_name() -> Optional[str]:
+    """
+    Read the current branch name straight from the HEAD file, without running `git`.
+
+    :return: the current branch name, "HEAD" if detached, or None if it could not be read (str)
+    """
+    try:
+        git_dir = _find_git_dir()
+        if git_dir is None:
+            return None
+        with open(os.path.join(git_dir, "HEAD"), "rb") as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+
+    if head == REFTABLE_STUB_HEAD:
+        return None
+    if head.startswith(HEAD_BRANCH_PREFIX):
+        return head[len(HEAD_BRANCH_PREFIX):].decode("utf-8", "replace")
+    if DETACHED_HEAD_PATTERN.fullmatch(head):
+        # Same as `git rev-parse --abbrev-ref HEAD`
+        return "HEAD"
+    return None
+
+
 def get_current_branch_name() -> str:
-  """Gets the current Git branch name using the `git` command.
+    """
+    Get the current Git branch name, falling back to the `git` command if HEAD cannot be read.
+
+    :return: the current branch name, or an empty string if there's an error or no branch (str)
+    """
+    branch_name = _read_branch_name()
+    if branch_name:
+        return branch_name
+
+    import subprocess
 
-  :return: the current branch name, or None if there's an error or no branch (str)
-  """
-  try:
-    result = subprocess.run(["git", "rev-parse", "--abbrev-ref", "HEAD"], capture_output=True, text=True)
-    result.check_returncode()
-    return result.stdout.strip()
-  except (subprocess.CalledProcessError, FileNotFoundError):
-    return ""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+    except FileNotFoundError:
+        return ""
+
+    if result.returncode != 0:
+        return ""
+    return result.stdout.decode("utf-8", "replace").strip()
 
 
-def parse_args() -> argparse.Namespace:
+@functools.lru_cache(maxsize=None)
+def _get_parser() -> "argparse.ArgumentParser":
     """
-    Parse arguments.
+    Build the argument parser on first use.
 
-    :return: a Namespace object containing parsed arguments
+    :return: the argument parser, reused for repeated calls
     """
+    import argparse
+
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
@@ -101,7 +240,16 @@ def parse_args() -> argparse.Namespace:
         "--exit-zero", action="store_true", help="Exit code 0 regardless of results"
     )
 
-    return parser.parse_args()
+    return parser
+
+
+def parse_args() -> "argparse.Namespace":
+    """
+    Parse arguments.
+
+    :return: a Namespace object containing parsed arguments
+    """
+    return _get_parser().parse_args()
 
 
 def main():
@@ -119,19 +267,15 @@ def main():
             branch_name=branch_name, accept_patterns=args.accept, reject_patterns=args.reject
         )
 
-    error_prefix = (
-        f"{TextStyle.ERROR.value}[ERR]{TextStyle.DEFAULT.value}"
-        if not args.exit_zero
-        else f"{TextStyle.WARN.value}[WARN]{TextStyle.DEFAULT.value}"
-    )
+    error_prefix = ERR_PREFIX if not args.exit_zero else WARN_PREFIX
 
     if result != 0:
         print(error_prefix, msg)
 
     if args.exit_zero:
-        exit(0)
+        sys.exit(0)
 
-    exit(result)
+    sys.exit(result)
 
 
 if __name__ == "__main__":
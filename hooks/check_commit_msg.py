@@ -4,22 +4,77 @@ Commit-msg hook to check the commit message format against regex patterns.
 One or multiple acceptance/rejection patterns can be supplied as arguments.
 """
 
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from enum import Enum
-import argparse
+import functools
 import re
+import sys
 
+if TYPE_CHECKING:
+    import argparse
 
-class TextStyle(Enum):
+
+# Coloured message prefixes, with the style reset already applied
+ERR_PREFIX = "\033[1;31m[ERR]\033[0m"  # Bold Red
+WARN_PREFIX = "\033[1;33m[WARN]\033[0m"  # Bold Yellow
+
+
+# Constructs that depend on group numbering or group names, or global inline flags
+# that would apply to every pattern, and so cannot be safely combined into a single
+# alternation
+UNCOMBINABLE_PATTERN = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)")
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str) -> re.Pattern:
     """
-    Enumeration for PASS/WARN/ERR colour codes.
+    Compile a regex pattern, reusing the result for repeated patterns.
+
+    :param pattern: the regex pattern to compile (str)
+    :return: the compiled pattern (re.Pattern)
     """
+    return re.compile(pattern)
 
-    DEFAULT = "\033[0m"  # Reset all styles
-    WARN = "\033[1;33m"  # Bold Yellow
-    ERROR = "\033[1;31m"  # Bold Red
-    OK = "\033[1;32m"  # Bold Green
+
+@functools.lru_cache(maxsize=256)
+def _compile_combined(patterns: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """
+    Combine regex patterns into a single alternation, one named group per pattern.
+
+    :param patterns: the regex patterns to combine, each already known to compile (Tuple[str, ...])
+    :return: the combined pattern, or None if the patterns cannot be combined (re.Pattern)
+    """
+    if any(UNCOMBINABLE_PATTERN.search(pattern) for pattern in patterns):
+        return None
+
+    try:
+        return re.compile(
+            "|".join(f"(?P<_p{i}>{pattern})" for i, pattern in enumerate(patterns))
+        )
+    except re.error:
+        # e.g. clashing group names
+        return None
+
+
+def _first_match(patterns: List[re.Pattern], string: str) -> Optional[str]:
+    """
+    Find the first of the compiled patterns that matches the start of a string.
+
+    :param patterns: the compiled patterns to try, in order (List[re.Pattern])
+    :param string: the string to match against (str)
+    :return: the source of the first matching pattern, or None if none match (str)
+    """
+    combined = _compile_combined(tuple(pattern.pattern for pattern in patterns))
+    if combined is None:
+        for pattern in patterns:
+            if pattern.match(string):
+                return pattern.pattern
+        return None
+
+    match = combined.match(string)
+    if match is None:
+        return None
+    return patterns[int(match.lastgroup[2:])].pattern
 
 
 def check_commit_msg(
@@ -45,9 +100,9 @@ def check_commit_msg(
         return 1, msg
 
     compiled_accept_patterns = []
-    for pattern in accept_patterns or [".*"]:
+    for pattern in accept_patterns or []:
         try:
-            compiled_accept_patterns.append(re.compile(pattern))
+            compiled_accept_patterns.append(_compile(pattern))
         except re.error as e:
             msg = f"Error compiling accept pattern: {pattern} ({e})"
             return 99, msg
@@ -55,19 +110,23 @@ def check_commit_msg(
     compiled_reject_patterns = []
     for pattern in reject_patterns or []:
         try:
-            compiled_reject_patterns.append(re.compile(pattern))
+            compiled_reject_patterns.append(_compile(pattern))
         except re.error as e:
             msg = f"Error compiling reject pattern: {pattern} ({e})"
             return 99, msg
 
-    for pattern in compiled_reject_patterns:
-        if pattern.match(commit_msg):
-            msg = f"Commit message matched rejection pattern: {pattern.pattern}"
+    if compiled_reject_patterns:
+        matched_pattern = _first_match(compiled_reject_patterns, commit_msg)
+        if matched_pattern is not None:
+            msg = f"Commit message matched rejection pattern: {matched_pattern}"
             return 2, msg
 
-    for pattern in compiled_accept_patterns:
-        if pattern.match(commit_msg):
-            return 0, ""
+    # No acceptance patterns means the default '.*', which always matches
+    if not compiled_accept_patterns:
+        return 0, ""
+
+    if _first_match(compiled_accept_patterns, commit_msg) is not None:
+        return 0, ""
 
     msg = "Commit message did not match any of the acceptance patterns supplied"
     return 1, msg
@@ -84,12 +143,15 @@ def get_commit_msg(filepath: str) -> str:
         return f.read().strip()
 
 
-def parse_args() -> argparse.Namespace:
+@functools.lru_cache(maxsize=None)
+def _get_parser() -> "argparse.ArgumentParser":
     """
-    Parse arguments.
+    Build the argument parser on first use.
 
-    :return: a Namespace object containing parsed arguments
+    :return: the argument parser, reused for repeated calls
     """
+    import argparse
+
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
@@ -103,7 +165,16 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("filepath", help="Path to the commit_msg file")
 
-    return parser.parse_args()
+    return parser
+
+
+def parse_args() -> "argparse.Namespace":
+    """
+    Parse arguments.
+
+    :return: a Namespace object containing parsed arguments
+    """
+    return _get_parser().parse_args()
 
 
 def main():
@@ -116,19 +187,15 @@ def main():
         commit_msg=commit_msg, accept_patterns=args.accept, reject_patterns=args.reject
     )
 
-    error_prefix = (
-        f"{TextStyle.ERROR.value}[ERR]{TextStyle.DEFAULT.value}"
-        if not args.exit_zero
-        else f"{TextStyle.WARN.value}[WARN]{TextStyle.DEFAULT.value}"
-    )
+    error_prefix = ERR_PREFIX if not args.exit_zero else WARN_PREFIX
 
     if result != 0:
         print(error_prefix, msg)
 
     if args.exit_zero:
-        exit(0)
+        sys.exit(0)
 
-    exit(result)
+    sys.exit(result)
 
 
 if __name__ == "__main__":
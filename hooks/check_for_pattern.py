@@ -4,84 +4,530 @@ Pre-commit hook to check for the presence of specified regex patterns in each fi
 One or multiple required/reject sequences can be supplied as arguments.
 """
 
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple, Union
 
-from enum import Enum
-import argparse
+from collections import defaultdict
+import functools
+import mmap
 import os
 import re
+import sys
+
+if TYPE_CHECKING:
+    import argparse
+
+try:
+    import ahocorasick
+except ImportError:  # Optional dependency
+    ahocorasick = None
+
+try:
+    import re2
+except ImportError:  # Optional dependency
+    re2 = None
 
 
 CONFIG_FILE_NAME = ".pre-commit-config.yaml"
 
+# Patterns containing none of these characters are plain literals
+REGEX_METACHARACTERS = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+# Constructs RE2 reads differently from re: its \s does not match \v, it reads {,n} as
+# literal text and [:alpha:] inside a set as a character class
+RE2_MISMATCH_PATTERN = re.compile(rb"\\[sS]|\{,|\[:")
+
+# Constructs RE2 only agrees with re on for ASCII content, as RE2's word characters, digits,
+# word boundaries and case folding do not follow Python's Unicode rules
+RE2_ASCII_ONLY_PATTERN = re.compile(r"\\[wWdDbB]|\(\?[-aiLmsux]*i")
+
+# re's \s matches \x1c-\x1f in text but not in bytes, so such patterns are only matched as text
+TEXT_ONLY_PATTERN = re.compile(r"\\[sS]")
+
+# Constructs that depend on group numbering or group names, or global inline flags
+# that would apply to every pattern, and so cannot be safely combined into a single
+# alternation
+UNCOMBINABLE_PATTERN = re.compile(rb"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)")
+
+# Files smaller than this are read into memory, as mapping them costs more than it saves
+MMAP_MIN_SIZE = 4096
+
+# Fewer literals than this are searched for one at a time, as bytes.find scans far faster
+# than the automaton and only loses once there are many literals to look for
+AUTOMATON_MIN_LITERALS = 32
+
+# Mapped files are checked for non-ASCII bytes this many at a time, as mmap has no isascii
+ASCII_CHECK_CHUNK_SIZE = 65536
+
+# Like git, files with a NUL byte in this many leading bytes are treated as binary
+BINARY_PROBE_SIZE = 8192
+
+# Fewer files than this are checked in-process, as starting workers costs more than it saves
+PARALLEL_MIN_FILES = 4
+
+
+# Coloured message prefixes, with the style reset already applied
+ERR_PREFIX = "\033[1;31m[ERR]\033[0m"  # Bold Red
+WARN_PREFIX = "\033[1;33m[WARN]\033[0m"  # Bold Yellow
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: Union[str, bytes]) -> re.Pattern:
+    """
+    Compile a regex pattern, using the linear-time RE2 engine when it is available.
+
+    Only bytes patterns are compiled with RE2; text patterns must follow re's Unicode rules.
+    Patterns RE2 does not support (e.g. backreferences and lookarounds) or reads differently
+    from re are compiled with re.
+
+    :param pattern: the regex pattern to compile (str or bytes)
+    :return: the compiled pattern, reused for repeated patterns (re.Pattern or re2._Regexp)
+    """
+    if re2 is not None and isinstance(pattern, bytes) and not RE2_MISMATCH_PATTERN.search(pattern):
+        options = re2.Options()
+        options.log_errors = False
+        try:
+            return re2.compile(pattern, options)
+        except re2.error:
+            pass
+
+    return re.compile(pattern)
+
+
+def _is_ascii(content: Union[bytes, mmap.mmap]) -> bool:
+    """
+    Check whether raw file content is entirely ASCII.
+
+    :param content: the raw file content (bytes or mmap.mmap)
+    :return: True if every byte is ASCII (bool)
+    """
+    if isinstance(content, bytes):
+        return content.isascii()
+
+    return all(
+        content[start:start + ASCII_CHECK_CHUNK_SIZE].isascii()
+        for start in range(0, len(content), ASCII_CHECK_CHUNK_SIZE)
+    )
+
+
+def _search(
+    pattern: str,
+    compiled: re.Pattern,
+    content: Union[bytes, mmap.mmap],
+    content_is_ascii: bool,
+    content_has_cr: bool,
+    decode: Callable[[], str],
+) -> bool:
+    """
+    Search raw file content for a regex pattern, avoiding a decode of the whole file where possible.
+
+    :param pattern: the regex pattern to search for (str)
+    :param compiled: the pattern as compiled by compile_patterns (re.Pattern or re2._Regexp)
+    :param content: the raw file content (bytes or mmap.mmap)
+    :param content_is_ascii: whether the content is entirely ASCII, from _is_ascii (bool)
+    :param content_has_cr: whether the content contains a carriage return (bool)
+    :param decode: returns the content decoded as text, shared across patterns (Callable[[], str])
+    :return: True if the pattern was found (bool)
+    """
+    # Line endings other than LF are only translated in the decoded text
+    if isinstance(compiled.pattern, bytes) and not content_has_cr:
+        if not isinstance(compiled, re.Pattern):
+            if content_is_ascii or not RE2_ASCII_ONLY_PATTERN.search(pattern):
+                # RE2 reads bytes as UTF-8
+                if compiled.search(content) is not None:
+                    return True
+                # re's '$' also matches just before a trailing newline, RE2's only at the very end
+                if "$" in pattern and content[-1:] == b"\n":
+                    with memoryview(content)[:-1] as view:
+                        return compiled.search(view) is not None
+                return False
+
+        # re matches bytes one byte at a time, which only agrees with matching the decoded
+        # text when everything is ASCII
+        elif pattern.isascii() and content_is_ascii:
+            return compiled.search(content) is not None
+
+    return _compile(pattern).search(decode()) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_combined(patterns: Tuple[bytes, ...]) -> Optional[re.Pattern]:
+    """
+    Combine regex patterns into a single alternation, one named group per pattern.
+
+    :param patterns: the regex patterns to combine, each already known to compile (Tuple[bytes, ...])
+    :return: the combined pattern, or None if the patterns cannot be combined (re.Pattern or re2._Regexp)
+    """
+    if any(UNCOMBINABLE_PATTERN.search(pattern) for pattern in patterns):
+        return None
+
+    try:
+        return _compile(
+            b"|".join(b"(?P<_p%d>%s)" % (i, pattern) for i, pattern in enumerate(patterns))
+        )
+    except re.error:
+        # e.g. clashing group names
+        return None
+
+
+def _find_regexes(
+    patterns: List[Tuple[str, re.Pattern]],
+    content: Union[bytes, mmap.mmap],
+    content_is_ascii: bool,
+    content_has_cr: bool,
+) -> Dict[str, bool]:
+    """
+    Find which of the regex patterns occur in the content, searching for them all at once.
+
+    Each search stops at the first match and is repeated without the pattern found, so
+    frequent matches for one pattern are never iterated over, and a search finding nothing
+    shows none of the rest are present. Patterns left undecided, such as the last one left,
+    need to be searched for individually.
+
+    :param patterns: the patterns to search for, from compile_patterns (List[Tuple[str, re.Pattern]])
+    :param content: the raw file content (bytes or mmap.mmap)
+    :param content_is_ascii: whether the content is entirely ASCII, from _is_ascii (bool)
+    :param content_has_cr: whether the content contains a carriage return (bool)
+    :return: whether each pattern decided here was found in the content (Dict[str, bool])
+    """
+    # As in _search, only the decoded text has its line endings translated
+    if content_has_cr:
+        return {}
+
+    patterns = [
+        (pattern, compiled) for pattern, compiled in patterns if isinstance(compiled.pattern, bytes)
+    ]
+
+    found = {}
+    while len(patterns) >= 2:
+        combined = _compile_combined(tuple(compiled.pattern for _, compiled in patterns))
+        if combined is None:
+            break
+        # As in _search, re can only match bytes when everything is ASCII, and RE2 can only
+        # match some constructs when the content is
+        if isinstance(combined, re.Pattern):
+            if not (content_is_ascii and all(pattern.isascii() for pattern, _ in patterns)):
+                break
+        elif not content_is_ascii and any(
+            RE2_ASCII_ONLY_PATTERN.search(pattern) for pattern, _ in patterns
+        ):
+            break
+
+        match = combined.search(content)
+        name = match and match.lastgroup
+        if (
+            match is None
+            and not isinstance(combined, re.Pattern)
+            and content[-1:] == b"\n"
+            and any("$" in pattern for pattern, _ in patterns)
+        ):
+            # As in _search, RE2's '$' only matches at the very end
+            with memoryview(content)[:-1] as view:
+                match = combined.search(view)
+                name = match and match.lastgroup
+                match = None  # Release the view before it is closed
+
+        if name is None:
+            found.update((pattern, False) for pattern, _ in patterns)
+            break
+        if isinstance(name, bytes):
+            name = name.decode("ascii")  # RE2 gives bytes group names for bytes patterns
+        if not name.startswith("_p"):
+            break
+        found[patterns.pop(int(name[2:]))[0]] = True
+
+    return found
+
+
+def _is_literal(pattern: str) -> bool:
+    """
+    Check whether a pattern matches only its own text.
+
+    :param pattern: the regex pattern to check (str)
+    :return: True if the pattern contains no regex metacharacters (bool)
+    """
+    return bool(pattern) and not REGEX_METACHARACTERS.search(pattern)
+
+
+@functools.lru_cache(maxsize=256)
+def _build_automaton(literals: Tuple[str, ...]) -> "ahocorasick.Automaton":
+    """
+    Build an Aho-Corasick automaton that finds any of the given literals.
+
+    The automaton works on text, so each literal is keyed by its UTF-8 bytes read as
+    Latin-1, which maps every byte to exactly one character.
+
+    :param literals: the literal strings to search for (Tuple[str, ...])
+    :return: the finalised automaton, reused for repeated literal sets (ahocorasick.Automaton)
+    """
+    automaton = ahocorasick.Automaton()
+    for literal in literals:
+        automaton.add_word(literal.encode("utf-8").decode("latin-1"), literal)
+    automaton.make_automaton()
+    return automaton
+
+
+def _find_literals(literals: Tuple[str, ...], content: Union[bytes, mmap.mmap]) -> Set[str]:
+    """
+    Find which of the given literals occur in the content, in a single pass if there are many.
+
+    :param literals: the literal strings to search for (Tuple[str, ...])
+    :param content: the raw file content to search (bytes or mmap.mmap)
+    :return: the literals found in the content (Set[str])
+    """
+    if not literals:
+        return set()
+
+    if ahocorasick is None or len(literals) < AUTOMATON_MIN_LITERALS:
+        return {literal for literal in literals if content.find(literal.encode("utf-8")) != -1}
+
+    found = set()
+    for _, literal in _build_automaton(literals).iter(str(content, "latin-1")):
+        found.add(literal)
+        if len(found) == len(literals):
+            break
+    return found
+
+
+def compile_patterns(patterns: List[str] = None) -> List[Tuple[str, Optional[re.Pattern]]]:
+    """
+    Compile patterns once, ready to be checked against any number of files.
+
+    :param patterns: list of regex patterns, which may use the -EsC- escape sequence (List[str], optional)
+    :return: a list of (pattern, compiled pattern) tuples, where the compiled pattern is None for
+             literal patterns that are searched for as plain text
+    :raises re.error: if a pattern is invalid
+    """
+    compiled_patterns = []
+    for pattern in patterns or []:
+        pattern = pattern.replace("-EsC-", "\\")
+        if _is_literal(pattern):
+            compiled_patterns.append((pattern, None))
+            continue
 
-class TextStyle(Enum):
+        # Always compiled with re first, so patterns are valid exactly when re accepts them
+        compiled = _compile(pattern)
+        if not TEXT_ONLY_PATTERN.search(pattern):
+            try:
+                # Prefer a bytes pattern so file content need not be decoded
+                compiled = _compile(pattern.encode("utf-8"))
+            except re.error:
+                pass  # e.g. \u escapes are only valid in text patterns
+        compiled_patterns.append((pattern, compiled))
+
+    return compiled_patterns
+
+
+def _check_content(
+    content: Union[bytes, mmap.mmap],
+    content_is_ascii: bool,
+    content_has_cr: bool,
+    filepath: str,
+    required_patterns: List[Tuple[str, Optional[re.Pattern]]] = None,
+    reject_patterns: List[Tuple[str, Optional[re.Pattern]]] = None,
+) -> Tuple[int, str]:
     """
-    Enumeration for PASS/WARN/ERR colour codes.
+    Check the content of a file against the required and reject patterns.
+
+    :param content: the raw file content (bytes or mmap.mmap)
+    :param content_is_ascii: whether the content is entirely ASCII, from _is_ascii (bool)
+    :param content_has_cr: whether the content contains a carriage return (bool)
+    :param filepath: path to the file being checked, for messages (str)
+    :param required_patterns: patterns to check for, from compile_patterns (List[Tuple[str, re.Pattern]], optional)
+    :param reject_patterns: patterns to reject, from compile_patterns (List[Tuple[str, re.Pattern]], optional)
+
+    :return: a tuple with an integer exit code, as for check_patterns_in_file
     """
+    reject_patterns = reject_patterns or []
+    required_patterns = required_patterns or []
+
+    @functools.lru_cache(maxsize=None)
+    def decode() -> str:
+        # Decoded on first use, then shared by every pattern that needs the text
+        text = str(content, "utf-8")
+        if content_has_cr:
+            # Universal newlines, as when reading the file in text mode
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text
 
-    DEFAULT = "\033[0m"  # Reset all styles
-    WARN = "\033[1;33m"  # Bold Yellow
-    ERROR = "\033[1;31m"  # Bold Red
-    OK = "\033[1;32m"  # Bold Green
+    def literal_found(pattern: str) -> bool:
+        # Literals spanning lines must be matched against the translated line endings
+        if content_has_cr and ("\r" in pattern or "\n" in pattern):
+            return pattern in decode()
+        return pattern in found_literals
+
+    # Invalid UTF-8 is an error whichever way each pattern would be matched
+    if not content_is_ascii:
+        decode()
+
+    # Search for the literal patterns up front; only true regexes need re
+    literals = tuple(
+        dict.fromkeys(
+            pattern for pattern, compiled in reject_patterns + required_patterns if compiled is None
+        )
+    )
+    found_literals = _find_literals(literals, content)
+    # Likewise search for all the regexes together, so a clean file is scanned once for them
+    regexes = {
+        pattern: compiled
+        for pattern, compiled in reject_patterns + required_patterns
+        if compiled is not None
+    }
+    found_regexes = _find_regexes(
+        list(regexes.items()),
+        content,
+        content_is_ascii,
+        content_has_cr,
+    )
+
+    for pattern, compiled in reject_patterns:
+        if compiled is None:
+            found = literal_found(pattern)
+        else:
+            found = found_regexes.get(pattern)
+            if found is None:
+                found = _search(
+                    pattern, compiled, content, content_is_ascii, content_has_cr, decode
+                )
+
+        if found:
+            msg = f"Rejected pattern '{pattern}' found in file: {filepath}"
+            return 2, msg
+
+    for pattern, compiled in required_patterns:
+        if compiled is None:
+            found = literal_found(pattern)
+        else:
+            found = found_regexes.get(pattern)
+            if found is None:
+                found = _search(
+                    pattern, compiled, content, content_is_ascii, content_has_cr, decode
+                )
+
+        if not found:
+            msg = f"Required pattern '{pattern}' not found in file: {filepath}"
+            return 1, msg
+
+    return 0, ""
 
 
 def check_patterns_in_file(
-    filepath: str, required_patterns: List[str] = None, reject_patterns: List[str] = None
+    filepath: str,
+    required_patterns: List[Tuple[str, Optional[re.Pattern]]] = None,
+    reject_patterns: List[Tuple[str, Optional[re.Pattern]]] = None,
 ) -> Tuple[int, str]:
     """
     Check if all accept patterns are present and no reject patterns are present in the file.
 
     :param filepath: path to the file being checked (str)
-    :param accept_patterns: list of regex patterns to check for (List[str], optional)
-    :param reject_patterns: list of regex patterns to reject (List[str], optional)
+    :param required_patterns: patterns to check for, from compile_patterns (List[Tuple[str, re.Pattern]], optional)
+    :param reject_patterns: patterns to reject, from compile_patterns (List[Tuple[str, re.Pattern]], optional)
 
     :return: a tuple with an integer exit code:
-             - 0: All accept patterns found and no reject patterns found
+             - 0: All accept patterns found and no reject patterns found, or the file is binary
              - 1: One or more accept patterns not found
              - 2: One or more reject patterns found
-             - 98: Invalid regex pattern encountered
              - 99: Error occurred during file reading
     """
     try:
-        with open(filepath, "r") as f:
-            content = f.read()
-
-        if reject_patterns:
-            for pattern in reject_patterns:
-                pattern = pattern.replace("-EsC-", "\\")
-                try:
-                    if re.search(pattern, content):
-                        msg = f"Rejected pattern '{pattern}' found in file: {filepath}"
-                        return 2, msg
-                except re.error as e:
-                    msg = f"Invalid reject pattern '{pattern}' in file: {filepath} ({e})"
-                    return 98, msg
-
-        if required_patterns:
-            for pattern in required_patterns:
-                pattern = pattern.replace("-EsC-", "\\")
-                try:
-                    if not re.search(pattern, content):
-                        msg = f"Required pattern '{pattern}' not found in file: {filepath}"
-                        return 1, msg
-                except re.error as e:
-                    msg = f"Invalid require pattern '{pattern}' in file: {filepath} ({e})"
-                    return 98, msg
-
-        return 0, ""
+        with open(filepath, "rb") as f:
+            if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+                content = f.read()
+            else:
+                content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if content.find(b"\x00", 0, BINARY_PROBE_SIZE) != -1:
+                return 0, ""
+
+            return _check_content(
+                content=content,
+                content_is_ascii=_is_ascii(content),
+                content_has_cr=content.find(b"\r") != -1,
+                filepath=filepath,
+                required_patterns=required_patterns,
+                reject_patterns=reject_patterns,
+            )
+        finally:
+            if isinstance(content, mmap.mmap):
+                content.close()
 
     except Exception as e:
         msg = f"Error reading file: {filepath} ({e})"
         return 99, msg
 
 
-def parse_args() -> argparse.Namespace:
+def _find_regular_files(filepaths: List[str]) -> Set[str]:
     """
-    Parse arguments.
+    Find which of the paths are regular files, listing each directory holding several
+    of them once instead of calling stat for every path.
 
-    :return: a Namespace object containing parsed arguments
+    :param filepaths: the paths to check (List[str])
+    :return: the paths that are regular files (Set[str])
     """
+    by_directory = defaultdict(list)
+    for filepath in filepaths:
+        directory, name = os.path.split(filepath)
+        by_directory[directory].append((filepath, name))
+
+    regular_files = set()
+    for directory, entries in by_directory.items():
+        if len(entries) == 1:
+            filepath, _ = entries[0]
+            if os.path.isfile(filepath):
+                regular_files.add(filepath)
+            continue
+
+        names = {name for _, name in entries}
+        try:
+            with os.scandir(directory or os.curdir) as it:
+                found = {entry.name for entry in it if entry.name in names and entry.is_file()}
+        except OSError:
+            continue
+        regular_files.update(filepath for filepath, name in entries if name in found)
+
+    return regular_files
+
+
+def check_files(
+    filepaths: List[str],
+    required_patterns: List[Tuple[str, Optional[re.Pattern]]] = None,
+    reject_patterns: List[Tuple[str, Optional[re.Pattern]]] = None,
+) -> Dict[str, Tuple[int, str]]:
+    """
+    Check each of the files for the patterns, spreading the work across processes.
+
+    :param filepaths: paths to the files being checked (List[str])
+    :param required_patterns: patterns to check for, from compile_patterns (List[Tuple[str, re.Pattern]], optional)
+    :param reject_patterns: patterns to reject, from compile_patterns (List[Tuple[str, re.Pattern]], optional)
+
+    :return: a dictionary mapping each path to its check_patterns_in_file result
+    """
+    check = functools.partial(
+        check_patterns_in_file,
+        required_patterns=required_patterns,
+        reject_patterns=reject_patterns,
+    )
+
+    workers = min(len(filepaths), os.cpu_count() or 1)
+    if workers == 1 or len(filepaths) < PARALLEL_MIN_FILES:
+        return {filepath: check(filepath) for filepath in filepaths}
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(filepaths) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return dict(zip(filepaths, executor.map(check, filepaths, chunksize=chunksize)))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_parser() -> "argparse.ArgumentParser":
+    """
+    Build the argument parser on first use.
+
+    :return: the argument parser, reused for repeated calls
+    """
+    import argparse
+
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
@@ -97,7 +543,16 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("files", nargs="+", help="Files to check")
 
-    return parser.parse_args()
+    return parser
+
+
+def parse_args() -> "argparse.Namespace":
+    """
+    Parse arguments.
+
+    :return: a Namespace object containing parsed arguments
+    """
+    return _get_parser().parse_args()
 
 
 def main():
@@ -105,41 +560,49 @@ def main():
     Drive the program.
     """
     args = parse_args()
-    required_patterns = args.require
-    reject_patterns = args.reject
+    error_prefix = ERR_PREFIX if not args.exit_zero else WARN_PREFIX
     exit_code = 0
 
-    for filepath in args.files:
-        if CONFIG_FILE_NAME in filepath:
-            continue
+    try:
+        reject_patterns = compile_patterns(args.reject)
+    except re.error as e:
+        print(error_prefix, f"Invalid reject pattern '{e.pattern}' ({e})")
+        sys.exit(0 if args.exit_zero else 98)
 
-        if not os.path.isfile(filepath):
-            print(
-                f"{TextStyle.ERROR.value}[ERR]{TextStyle.DEFAULT.value} File not found: {filepath}"
-            )
+    try:
+        required_patterns = compile_patterns(args.require)
+    except re.error as e:
+        print(error_prefix, f"Invalid require pattern '{e.pattern}' ({e})")
+        sys.exit(0 if args.exit_zero else 98)
+
+    filepaths = [
+        filepath for filepath in args.files if os.path.basename(filepath) != CONFIG_FILE_NAME
+    ]
+
+    regular_files = _find_regular_files(filepaths)
+    results = check_files(
+        filepaths=[filepath for filepath in filepaths if filepath in regular_files],
+        required_patterns=required_patterns,
+        reject_patterns=reject_patterns,
+    )
+
+    for filepath in filepaths:
+        if filepath not in results:
+            print(ERR_PREFIX, f"File not found: {filepath}")
             exit_code = 99
             continue
 
-        result, msg = check_patterns_in_file(
-            filepath=filepath,
-            required_patterns=required_patterns,
-            reject_patterns=reject_patterns
-        )
+        result, msg = results[filepath]
 
         if result != 0:
-            error_prefix = (
-                f"{TextStyle.ERROR.value}[ERR]{TextStyle.DEFAULT.value}"
-                if not args.exit_zero
-                else f"{TextStyle.WARN.value}[WARN]{TextStyle.DEFAULT.value}"
-            )
             print(error_prefix, msg)
             if not args.exit_zero:
                 exit_code = result
 
     if args.exit_zero:
-        exit(0)
+        sys.exit(0)
 
-    exit(exit_code)
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
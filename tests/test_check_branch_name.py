@@ -7,6 +7,7 @@ import subprocess
 from unittest.mock import Mock, patch
 
 from hooks.check_branch_name import (
+    _compile_combined,
     check_branch_name,
     get_current_branch_name,
     parse_args,
@@ -50,6 +51,46 @@ def test_check_branch_name_invalid_patterns():
     assert "Branch name matched rejection pattern" in msg
 
 
+def test_check_branch_name_whole_name():
+    """Test check_branch_name patterns must match the whole branch name."""
+    result, msg = check_branch_name("feat/new-hook", accept_patterns=["feat/"])
+    assert result == 1, msg
+
+    result, msg = check_branch_name("maintenance", reject_patterns=["main"])
+    assert result == 0, msg
+
+    result, msg = check_branch_name("feat/new-hook", accept_patterns=["fix/.*", "feat/.*"])
+    assert result == 0, msg
+
+
+def test_check_branch_name_reports_matched_reject_pattern():
+    """Test check_branch_name reports the first reject pattern that matched."""
+    patterns = ["main", "release/.*", "(rel)ease/.*"]
+    result, msg = check_branch_name("release/1.0", reject_patterns=patterns)
+    assert result == 2, msg
+    assert msg == "Branch name matched rejection pattern: release/.*"
+
+
+def test_check_branch_name_uncombinable_patterns():
+    """Test check_branch_name with patterns that cannot be combined into one regex."""
+    # Backreferences depend on group numbering
+    patterns = ["(a)-\\1", "(b)-\\1"]
+    result, msg = check_branch_name("b-b", accept_patterns=patterns)
+    assert result == 0, msg
+
+    result, msg = check_branch_name("b-a", accept_patterns=patterns)
+    assert result == 1, msg
+
+    # Global inline flags would apply to every pattern in a combined expression
+    result, msg = check_branch_name("MAIN", reject_patterns=["dev", "(?i)main"])
+    assert result == 2, msg
+    assert "(?i)main" in msg
+
+    result, msg = check_branch_name("DEV", reject_patterns=["dev", "(?i)main"])
+    assert result == 0, msg
+    assert _compile_combined(("dev", "(?i)main")) is None
+
+
 def test_check_branch_name_compilation_error():
     with patch.object(re, "compile") as mock_compile:
         mock_compile.side_effect = re.error("This is a mock compilation error")
@@ -59,7 +100,8 @@ def test_check_branch_name_compilation_error():
 
 
 def test_get_current_branch_name_success(mocker):
-    """Test successful retrieval of the current branch name."""
+    """Test successful retrieval of the current branch name from the git command."""
+    mocker.patch("hooks.check_branch_name._read_branch_name", return_value=None)
     expected_branch_name = "master"
     mocker.patch.object(
         subprocess,
@@ -67,7 +109,7 @@ def test_get_current_branch_name_success(mocker):
         return_value=subprocess.CompletedProcess(
             ["git", "rev-parse", "--abbrev-ref", "HEAD"],
             returncode=0,
-            stdout=f"{expected_branch_name}\n",
+            stdout=f"{expected_branch_name}\n".encode(),
         ),
     )
     branch_name = get_current_branch_name()
@@ -75,11 +117,16 @@ def test_get_current_branch_name_success(mocker):
 
 
 def test_get_current_branch_name_error(mocker):
-    """Test getting an empty string when a subprocess error occurs."""
+    """Test getting an empty string when the git command fails."""
+    mocker.patch("hooks.check_branch_name._read_branch_name", return_value=None)
     mocker.patch.object(
         subprocess,
         "run",
-        side_effect=subprocess.CalledProcessError(cmd="run", returncode=1),
+        return_value=subprocess.CompletedProcess(
+            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+            returncode=128,
+            stdout=b"",
+        ),
     )
     branch_name = get_current_branch_name()
     assert branch_name == ""
@@ -87,11 +134,63 @@ def test_get_current_branch_name_error(mocker):
 
 def test_get_current_branch_name_no_git(mocker):
     """Test getting an empty string when the git command is not found."""
+    mocker.patch("hooks.check_branch_name._read_branch_name", return_value=None)
     mocker.patch.object(subprocess, "run", side_effect=FileNotFoundError)
     branch_name = get_current_branch_name()
     assert branch_name == ""
 
 
+def test_get_current_branch_name_from_head(tmp_path, monkeypatch, mocker):
+    """Test reading the current branch name from HEAD without running git."""
+    run = mocker.patch.object(subprocess, "run")
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/feat/new-hook\n")
+    (tmp_path / "src").mkdir()
+    monkeypatch.chdir(tmp_path / "src")
+
+    assert get_current_branch_name() == "feat/new-hook"
+
+    # Detached HEAD
+    (tmp_path / ".git" / "HEAD").write_text("0123456789abcdef0123456789abcdef01234567\n")
+    assert get_current_branch_name() == "HEAD"
+    run.assert_not_called()
+
+
+def test_get_current_branch_name_from_worktree_head(tmp_path, monkeypatch, mocker):
+    """Test reading the current branch name when .git is a gitdir redirect."""
+    run = mocker.patch.object(subprocess, "run")
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    git_dir = tmp_path / "main" / ".git" / "worktrees" / "wt"
+    git_dir.mkdir(parents=True)
+    (git_dir / "HEAD").write_text("ref: refs/heads/fix/bug\n")
+    (tmp_path / "wt").mkdir()
+    (tmp_path / "wt" / ".git").write_text("gitdir: ../main/.git/worktrees/wt\n")
+    monkeypatch.chdir(tmp_path / "wt")
+
+    assert get_current_branch_name() == "fix/bug"
+    run.assert_not_called()
+
+
+def test_get_current_branch_name_reftable(tmp_path, monkeypatch, mocker):
+    """Test falling back to git when HEAD is the reftable backend's stub."""
+    mocker.patch.object(
+        subprocess,
+        "run",
+        return_value=subprocess.CompletedProcess(
+            ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+            returncode=0,
+            stdout=b"feat/reftable\n",
+        ),
+    )
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "HEAD").write_text("ref: refs/heads/.invalid\n")
+    monkeypatch.chdir(tmp_path)
+
+    assert get_current_branch_name() == "feat/reftable"
+
+
 def test_single_accept():
     """Test parsing with a single accept pattern."""
     original_argv = sys.argv
@@ -6,7 +6,7 @@ import re
 import sys
 from unittest.mock import Mock, patch
 
-from hooks.check_commit_msg import check_commit_msg, get_commit_msg, parse_args, main
+from hooks.check_commit_msg import _compile_combined, check_commit_msg, get_commit_msg, parse_args, main
 
 
 def test_check_commit_msg_valid_patterns():
@@ -45,6 +45,34 @@ def test_check_commit_msg_invalid_patterns():
     assert "Commit message matched rejection pattern" in msg
 
 
+def test_check_commit_msg_reports_matched_reject_pattern():
+    """Test check_commit_msg reports the first reject pattern that matched."""
+    patterns = ["main", "release/.*", "(rel)ease/.*"]
+    result, msg = check_commit_msg("release/1.0", reject_patterns=patterns)
+    assert result == 2, msg
+    assert msg == "Commit message matched rejection pattern: release/.*"
+
+
+def test_check_commit_msg_uncombinable_patterns():
+    """Test check_commit_msg with patterns that cannot be combined into one regex."""
+    # Backreferences depend on group numbering
+    patterns = ["(a)-\\1", "(b)-\\1"]
+    result, msg = check_commit_msg("b-b", accept_patterns=patterns)
+    assert result == 0, msg
+
+    result, msg = check_commit_msg("b-a", accept_patterns=patterns)
+    assert result == 1, msg
+
+    # Global inline flags would apply to every pattern in a combined expression
+    result, msg = check_commit_msg("MAIN", reject_patterns=["dev", "(?i)main"])
+    assert result == 2, msg
+    assert "(?i)main" in msg
+
+    result, msg = check_commit_msg("DEV", reject_patterns=["dev", "(?i)main"])
+    assert result == 0, msg
+    assert _compile_combined(("dev", "(?i)main")) is None
+
+
 def test_check_commit_msg_compilation_error():
     with patch.object(re, "compile") as mock_compile:
         mock_compile.side_effect = re.error("This is a mock compilation error")
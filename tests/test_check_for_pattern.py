@@ -1,5 +1,13 @@
 import pytest
-from hooks.check_for_pattern import check_patterns_in_file, main
+import re
+from hooks.check_for_pattern import (
+    _compile_combined,
+    _find_regexes,
+    check_files,
+    check_patterns_in_file,
+    compile_patterns,
+    main,
+)
 
 
 # Utility function to create a temporary file with content
@@ -13,18 +21,35 @@ def temp_file(tmpdir):
 
 
 # Test regex issues
-def test_invalid_reject_pattern(temp_file):
+def test_invalid_reject_pattern(temp_file, monkeypatch, capsys):
     file_path = temp_file("This file has some content.")
-    result, msg = check_patterns_in_file(file_path, reject_patterns=["[invalid["])
-    assert result == 98
-    assert "Invalid reject pattern" in msg
+    monkeypatch.setattr("argparse._sys.argv", ["check_for_pattern.py", "-r", "[invalid[", file_path])
 
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+
+    assert excinfo.value.code == 98
+    assert "Invalid reject pattern '[invalid['" in capsys.readouterr().out
 
-def test_invalid_accept_pattern(temp_file):
+
+def test_invalid_accept_pattern(temp_file, monkeypatch, capsys):
     file_path = temp_file("This file has some content.")
-    result, msg = check_patterns_in_file(file_path, required_patterns=["[invalid["])
-    assert result == 98
-    assert "Invalid require pattern" in msg
+    monkeypatch.setattr("argparse._sys.argv", ["check_for_pattern.py", "-q", "[invalid[", file_path])
+
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+
+    assert excinfo.value.code == 98
+    assert "Invalid require pattern '[invalid['" in capsys.readouterr().out
+
+
+def test_compile_patterns():
+    patterns = compile_patterns(["TODO", "-EsC-(c-EsC-)", "20[0-9]{2}"])
+    assert [pattern for pattern, _ in patterns] == ["TODO", "\\(c\\)", "20[0-9]{2}"]
+    assert patterns[0][1] is None
+
+    with pytest.raises(re.error):
+        compile_patterns(["[invalid["])
 
 
 def test_custom_escape_sequence_replacement(temp_file):
@@ -34,38 +59,265 @@ def test_custom_escape_sequence_replacement(temp_file):
     required_sequence = "-EsC-(c-EsC-)"
     reject_sequence = "-EsC-[r-EsC-]"
     
-    result, _ = check_patterns_in_file(file_path, required_patterns=[required_sequence])
+    result, _ = check_patterns_in_file(file_path, required_patterns=compile_patterns([required_sequence]))
     assert result == 0
     
-    result, _ = check_patterns_in_file(file_path, reject_patterns=[reject_sequence])
+    result, _ = check_patterns_in_file(file_path, reject_patterns=compile_patterns([reject_sequence]))
     assert result == 2
 
 
+def test_lookaround_and_backreference_patterns(temp_file):
+    # Not supported by RE2, so these must still work through re
+    file_path = temp_file("version = 1.2.3-1.2.3")
+
+    result, _ = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["version(?= =)"])
+    )
+    assert result == 0
+
+    result, _ = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["(1-EsC-.2)-EsC-.3--EsC-1"])
+    )
+    assert result == 2
+
+
+def test_patterns_match_as_with_re(temp_file):
+    # RE2 reads these differently, so when installed it must not change what they match
+    for pattern, content in [
+        ("a-EsC-sb", "a\x0bb"),
+        ("a-EsC-sb", "a\x1cb"),
+        ("a-EsC-sb", "a\xa0b"),
+        ("-EsC-d", "٣"),
+        ("^-EsC-w+$", "café"),
+        ("-EsC-bé", " é"),
+        ("(?i)ſ", "s"),
+        ("a{,3}b", "ab"),
+    ]:
+        result, _ = check_patterns_in_file(
+            temp_file(content), required_patterns=compile_patterns([pattern])
+        )
+        assert result == 0, pattern
+
+    # Valid for RE2 but not for re
+    for pattern in ["-EsC-z", "-EsC-pL", "-EsC-C", "-EsC-x{41}"]:
+        with pytest.raises(re.error):
+            compile_patterns([pattern])
+
+
+def test_non_ascii_patterns(temp_file):
+    file_path = temp_file("© 2024 Société Générale")
+
+    result, _ = check_patterns_in_file(
+        file_path,
+        required_patterns=compile_patterns(["©", "Soci[éè]t[éè]", "G.n.rale", "Soci-EsC-u00e9t"]),
+    )
+    assert result == 0
+
+    result, _ = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["é{2}", "-EsC-u00e9{2}"])
+    )
+    assert result == 0
+
+
+def test_invalid_utf8_file(tmpdir):
+    file = tmpdir.join("latin1.txt")
+    file.write_binary("café foo\n".encode("latin-1"))
+
+    # An error however each pattern is matched
+    for pattern in ["caf.", "é", "f-EsC-w+", "foo"]:
+        result, msg = check_patterns_in_file(str(file), required_patterns=compile_patterns([pattern]))
+        assert result == 99, pattern
+        assert "Error reading file" in msg
+
+
+def test_large_file(temp_file):
+    # Large enough to be memory-mapped rather than read
+    file_path = temp_file("x = 1\n" * 2000 + "# Copyright © 2024\n")
+
+    result, _ = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["Copyright ©", "20[0-9]{2}$", "©.2024"])
+    )
+    assert result == 0
+
+    result, msg = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["TODO", "x = [0-9]"])
+    )
+    assert result == 2
+    assert "Rejected pattern 'x = [0-9]' found" in msg
+
+
+def test_large_file_non_ascii_at_end(temp_file):
+    # Non-ASCII text only well after the start of a memory-mapped file
+    file_path = temp_file("x = 1\n" * 20000 + "# Société Générale\n")
+
+    result, _ = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["G.n.rale$", "Soci.t."])
+    )
+    assert result == 0
+
+
+def test_crlf_line_endings(temp_file):
+    # Line endings are translated as when reading the file in text mode
+    for newline in ["\r\n", "\r"]:
+        for prefix in ["", "x = 1" + newline * 5000]:  # Small files are read, large ones mapped
+            file_path = temp_file(prefix + newline.join(["x = 1", "bar", "foo", ""]))
+
+            result, msg = check_patterns_in_file(
+                file_path,
+                required_patterns=compile_patterns(["(?m)^bar$", "bar-EsC-nfoo", "(?s)bar.foo"]),
+            )
+            assert result == 0, msg
+
+            result, msg = check_patterns_in_file(
+                file_path, reject_patterns=compile_patterns(["-EsC-r", "bar\r", "foo$"])
+            )
+            assert result == 2
+            assert "Rejected pattern 'foo$' found" in msg
+
+
+def test_binary_file_skipped(tmpdir):
+    file = tmpdir.join("image.png")
+    file.write_binary(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR TODO")
+
+    result, msg = check_patterns_in_file(
+        str(file),
+        required_patterns=compile_patterns(["Copyright"]),
+        reject_patterns=compile_patterns(["TODO"]),
+    )
+    assert result == 0
+    assert msg == ""
+
+
+def test_overlapping_required_patterns(temp_file):
+    # A match for the first pattern covers the only match for the second
+    file_path = temp_file("x = 1\n" * 1000 + "foo bar\n")
+
+    result, msg = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["fo+ bar", "ba[rz]", "x = [0-9]"])
+    )
+    assert result == 0, msg
+
+    result, msg = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["fo+ bar", "ba[rz]", "y = [0-9]"])
+    )
+    assert result == 1
+    assert "Required pattern 'y = [0-9]' not found" in msg
+
+
+def test_reject_patterns_searched_together(temp_file):
+    content = "x = 1\n" * 1000 + "print(x)  # TODO\n"
+    file_path = temp_file(content)
+
+    # A clean file rules out every pattern with a combined search
+    regexes = compile_patterns(["FIX(ME)?", "breakpoint-EsC-(", "y = [0-9]"])
+    assert _find_regexes(regexes, content.encode(), True, False) == {
+        "FIX(ME)?": False,
+        "breakpoint\\(": False,
+        "y = [0-9]": False,
+    }
+
+    # The first listed pattern found is reported, not the first found in the file
+    result, msg = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["FIX(ME)?", "TO+DO", "x = [0-9]"])
+    )
+    assert result == 2
+    assert "Rejected pattern 'TO+DO' found" in msg
+
+
+def test_inline_flag_patterns_not_combined(temp_file):
+    # A global flag in one pattern must not apply to the others
+    file_path = temp_file("FOO bar")
+
+    result, msg = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["fo+", "(?i)ba+r"])
+    )
+    assert result == 1
+    assert "Required pattern 'fo+' not found" in msg
+    assert _compile_combined((b"fo+", b"(?i)ba+r")) is None
+
+
+# Test literal pattern search
+def test_literal_and_regex_patterns(temp_file):
+    file_path = temp_file("Copyright 2024\n# TODO: tidy up")
+
+    result, msg = check_patterns_in_file(
+        file_path,
+        required_patterns=compile_patterns(["Copyright", "20[0-9]{2}"]),
+        reject_patterns=compile_patterns(["FIXME"]),
+    )
+    assert result == 0
+    assert msg == ""
+
+    result, msg = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["FIXME", "print-EsC-(", "TODO"])
+    )
+    assert result == 2
+    assert "Rejected pattern 'TODO' found" in msg
+
+
+def test_many_literal_patterns(temp_file):
+    file_path = temp_file("keyword_7 keyword_23 keyword_39")
+    literals = [f"keyword_{i}" for i in range(40)]
+
+    result, msg = check_patterns_in_file(
+        file_path,
+        required_patterns=compile_patterns(["keyword_7", "keyword_39"]),
+        reject_patterns=compile_patterns(literals[7:20]),
+    )
+    assert result == 2
+    assert "Rejected pattern 'keyword_7' found" in msg
+
+    # Enough literals to be searched for in a single pass
+    result, msg = check_patterns_in_file(file_path, required_patterns=compile_patterns(literals))
+    assert result == 1
+    assert "Required pattern 'keyword_0' not found" in msg
+
+
+def test_literal_patterns_without_automaton(temp_file, monkeypatch):
+    monkeypatch.setattr("hooks.check_for_pattern.ahocorasick", None)
+    file_path = temp_file("Copyright 2024")
+
+    result, _ = check_patterns_in_file(file_path, required_patterns=compile_patterns(["Copyright"]))
+    assert result == 0
+
+    result, msg = check_patterns_in_file(file_path, required_patterns=compile_patterns(["License"]))
+    assert result == 1
+    assert "Required pattern 'License' not found" in msg
+
+
 # Test basic functionality
 def test_reject_pattern_found(temp_file):
     file_path = temp_file("This file contains a reject pattern.")
-    result, msg = check_patterns_in_file(file_path, reject_patterns=["reject pattern"])
+    result, msg = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["reject pattern"])
+    )
     assert result == 2
     assert "Rejected pattern 'reject pattern' found" in msg
 
 
 def test_no_reject_pattern_no_accept(temp_file):
     file_path = temp_file("This file is clean of any patterns.")
-    result, msg = check_patterns_in_file(file_path, reject_patterns=["reject pattern"])
+    result, msg = check_patterns_in_file(
+        file_path, reject_patterns=compile_patterns(["reject pattern"])
+    )
     assert result == 0
     assert msg == ""
 
 
 def test_accept_pattern_found(temp_file):
     file_path = temp_file("This file contains the correct pattern.")
-    result, msg = check_patterns_in_file(file_path, required_patterns=["correct pattern"])
+    result, msg = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["correct pattern"])
+    )
     assert result == 0
     assert msg == ""
 
 
 def test_accept_pattern_not_found(temp_file):
     file_path = temp_file("This file is missing a required pattern.")
-    result, msg = check_patterns_in_file(file_path, required_patterns=["This is required"])
+    result, msg = check_patterns_in_file(
+        file_path, required_patterns=compile_patterns(["This is required"])
+    )
     assert result == 1
     assert "Required pattern 'This is required' not found" in msg
 
@@ -73,7 +325,9 @@ def test_accept_pattern_not_found(temp_file):
 def test_no_reject_pattern_and_accept_pattern(temp_file):
     file_path = temp_file("This file contains the correct pattern.")
     result, msg = check_patterns_in_file(
-        file_path, required_patterns=["correct pattern"], reject_patterns=["reject pattern"]
+        file_path,
+        required_patterns=compile_patterns(["correct pattern"]),
+        reject_patterns=compile_patterns(["reject pattern"]),
     )
     assert result == 0
     assert msg == ""
@@ -82,7 +336,9 @@ def test_no_reject_pattern_and_accept_pattern(temp_file):
 def test_no_reject_pattern_no_accept_pattern(temp_file):
     file_path = temp_file("This file has no relevant patterns.")
     result, msg = check_patterns_in_file(
-        file_path, required_patterns=["correct pattern"], reject_patterns=["reject pattern"]
+        file_path,
+        required_patterns=compile_patterns(["correct pattern"]),
+        reject_patterns=compile_patterns(["reject pattern"]),
     )
     assert result == 1
     assert "Required pattern 'correct pattern' not found" in msg
@@ -133,3 +389,66 @@ def test_all_files_fail(temp_file, monkeypatch):
         main()
     
     assert excinfo.value.code == 1
+
+
+def test_config_file_skipped(tmpdir, monkeypatch):
+    config = tmpdir.join(".pre-commit-config.yaml")
+    config.write("args: ['--reject=TODO']")
+    backup = tmpdir.join("my.pre-commit-config.yaml.bak")
+    backup.write("TODO")
+
+    monkeypatch.setattr("argparse._sys.argv", ["check_for_pattern.py", "-r", "TODO", str(config)])
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 0
+
+    monkeypatch.setattr("argparse._sys.argv", ["check_for_pattern.py", "-r", "TODO", str(backup)])
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+    assert excinfo.value.code == 2
+
+
+def test_missing_files(tmpdir, monkeypatch):
+    file1 = tmpdir.join("present.txt")
+    file1.write("This file contains the correct pattern.")
+    file2 = tmpdir.join("other.txt")
+    file2.write("Another file with the correct pattern.")
+    missing = [str(tmpdir.join("missing.txt")), str(tmpdir.join("nowhere", "missing.txt")), str(tmpdir)]
+
+    for files in ([str(file1), missing[0]], [str(file1), str(file2), *missing]):
+        monkeypatch.setattr("argparse._sys.argv", ["check_for_pattern.py", "-q", "correct pattern", *files])
+        with pytest.raises(SystemExit) as excinfo:
+            main()
+        assert excinfo.value.code == 99
+
+
+def test_many_files(tmpdir, monkeypatch):
+    # Enough files to be checked in parallel
+    files = []
+    for i in range(8):
+        file = tmpdir.join(f"file_{i}.txt")
+        file.write("This file contains the correct pattern." if i != 5 else "Missing.")
+        files.append(str(file))
+
+    monkeypatch.setattr("argparse._sys.argv", ["check_for_pattern.py", "-q", "correct pattern", *files])
+    monkeypatch.setattr("os.cpu_count", lambda: 4)  # So the files are checked in parallel
+
+    with pytest.raises(SystemExit) as excinfo:
+        main()
+
+    assert excinfo.value.code == 1
+
+
+def test_many_files_single_cpu(tmpdir, monkeypatch):
+    # With one CPU there is nothing to gain from worker processes
+    files = []
+    for i in range(8):
+        file = tmpdir.join(f"file_{i}.txt")
+        file.write("This file contains the correct pattern.")
+        files.append(str(file))
+
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", None)
+
+    results = check_files(files, required_patterns=compile_patterns(["correct pattern"]))
+    assert results == {file: (0, "") for file in files}